@@ -9,14 +9,37 @@ Environment variables:
     GLINER_PORT: Server port (default: 8090)
     GLINER_THRESHOLD: Minimum confidence score (default: 0.3)
     GLINER_MAX_LENGTH: Maximum text length in characters (default: 10000)
+    GLINER_MAX_BATCH: Maximum requests coalesced into one forward pass (default: 16)
+    GLINER_BATCH_WINDOW_MS: Time to wait for more requests to batch (default: 10)
+    GLINER_BACKEND: "torch" or "onnx" to run an ONNX export via onnxruntime (default: torch)
+    GLINER_ONNX_FILE: ONNX file within the model repo (default: model.onnx)
+    GLINER_QUANT: Set to "int8" for dynamic int8 quantization of Linear layers
+        (torch backend only; check F1 on a held-out set before enabling) (default: unset)
+    GLINER_PACKING: Set to 1 to pack short sequences into shared rows (default: 0)
+    GLINER_COMPILE: Set to 1 to torch.compile the model and warm it on the batcher's
+        shape buckets at startup; needs a C++ toolchain in the image (default: 0)
+    GLINER_BF16: Set to 1 to run inference under bfloat16 autocast (default: 0)
+    TORCH_THREADS: Intra-op threads per inference process (default: half the CPUs,
+        split across GLINER_WORKERS)
+    GLINER_DEDUP_OFFSETS: Set to 1 to deduplicate entities by span offsets, keeping
+        repeated mentions of the same text, instead of by surface text (default: 0)
+    GLINER_CACHE_SIZE: Results cached by (text, labels, threshold); 0 disables (default: 4096)
+    GLINER_WORKERS: Inference worker processes, each holding its own model copy;
+        0 runs inference on a thread in the server process (default: 0)
 """
 
+import asyncio
+import hashlib
+import multiprocessing
 import os
 import logging
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from contextlib import asynccontextmanager
 
+import torch
 from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel, Field
 
 logging.basicConfig(level=logging.INFO)
@@ -25,21 +48,293 @@ logger = logging.getLogger("gliner-sidecar")
 MODEL_NAME = os.environ.get("GLINER_MODEL", "urchade/gliner_large-v2.1")
 DEFAULT_THRESHOLD = float(os.environ.get("GLINER_THRESHOLD", "0.3"))
 MAX_LENGTH = int(os.environ.get("GLINER_MAX_LENGTH", "10000"))
+MAX_BATCH = int(os.environ.get("GLINER_MAX_BATCH", "16"))
+BATCH_WINDOW = int(os.environ.get("GLINER_BATCH_WINDOW_MS", "10")) / 1000
+BACKEND = os.environ.get("GLINER_BACKEND", "torch")
+ONNX_FILE = os.environ.get("GLINER_ONNX_FILE", "model.onnx")
+QUANT = os.environ.get("GLINER_QUANT", "")
+PACKING = os.environ.get("GLINER_PACKING", "0") == "1"
+WORKERS = int(os.environ.get("GLINER_WORKERS", "0"))
+BF16 = os.environ.get("GLINER_BF16", "0") == "1"
+COMPILE = os.environ.get("GLINER_COMPILE", "0") == "1"
+DEDUP_OFFSETS = os.environ.get("GLINER_DEDUP_OFFSETS", "0") == "1"
+TORCH_THREADS = int(
+    os.environ.get(
+        "TORCH_THREADS", max(1, (os.cpu_count() or 2) // 2 // max(1, WORKERS))
+    )
+)
+CACHE_SIZE = int(os.environ.get("GLINER_CACHE_SIZE", "4096"))
 
-# GLiNER model instance (loaded once at startup)
+# GLiNER model instance (loaded once per inference process)
 model = None
+# Inference packing config, set at startup when GLINER_PACKING=1 and supported
+packing_config = None
+# Executor running inference off the event loop (set once startup completes)
+executor = None
+# LRU of inference futures keyed by cache_key(); concurrent identical
+# requests share one in-flight future, later ones get the cached result
+result_cache: OrderedDict = OrderedDict()
 
+# Safe batch size per sequence-length bucket (in words, GLiNER's unit).
+# Attention cost grows quadratically with length, so long inputs get
+# smaller batches to avoid memory cliffs on mixed-length queues.
+CALIB = {64: 64, 128: 32, 256: 16, 384: 8, 512: 4}
+_BUCKETS = sorted(CALIB)
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Load GLiNER model on startup."""
-    global model
-    logger.info(f"Loading GLiNER model: {MODEL_NAME}")
+
+def load_model():
+    """Load GLiNER with the configured backend."""
     from gliner import GLiNER
+
+    if BACKEND == "onnx":
+        # The model repo must ship an ONNX export (opset >= 14). Sequence
+        # length stays at 512: longer windows regress badly under ONNX.
+        return GLiNER.from_pretrained(
+            MODEL_NAME,
+            load_onnx_model=True,
+            load_tokenizer=True,
+            onnx_model_file=ONNX_FILE,
+            max_length=_BUCKETS[-1],
+        )
     model = GLiNER.from_pretrained(MODEL_NAME)
+    if QUANT == "int8":
+        model.model = torch.ao.quantization.quantize_dynamic(
+            model.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+        logger.info("Applied dynamic int8 quantization to Linear layers")
+    return model
+
+
+def load_packing_config(model):
+    """Build GLiNER's inference packing config, or None if unsupported."""
+    try:
+        from gliner import InferencePackingConfig
+    except ImportError:
+        logger.warning("GLINER_PACKING=1 but this GLiNER version has no packing support")
+        return None
+    tokenizer = model.data_processor.transformer_tokenizer
+    return InferencePackingConfig(
+        max_length=_BUCKETS[-1],
+        sep_token_id=tokenizer.sep_token_id,
+        streams_per_batch=MAX_BATCH,
+    )
+
+
+def init_worker():
+    """Load the model into the current process.
+
+    Used as the process pool initializer, and called directly when
+    inference runs in the server process.
+    """
+    global model, packing_config
+    torch.set_num_threads(TORCH_THREADS)
+    torch.set_num_interop_threads(1)
+    model = load_model()
+    if PACKING:
+        packing_config = load_packing_config(model)
+    if COMPILE and BACKEND != "onnx":
+        compile_model()
+
+
+def warm_text(target_tokens: int, labels: list[str]) -> str:
+    """Build a text whose encoder input (label prompt included) spans about
+    target_tokens subword tokens, measured with the model's own tokenizer.
+
+    The word count is capped at the model's max_len, past which GLiNER
+    truncates anyway.
+    """
+    tokenize = model.data_processor.tokenize_inputs
+
+    def input_length(words: int) -> int:
+        return tokenize([["test"] * words], labels)["input_ids"].shape[1]
+
+    base = input_length(1)
+    per_word = max(1, input_length(2) - base)
+    words = 1 + max(0, target_tokens - base) // per_word
+    return " ".join(["test"] * min(words, model.config.max_len))
+
+
+def compile_model():
+    """torch.compile the encoder and warm it on the shapes the batcher sends.
+
+    Each bucket is warmed at batch size 1 and at the batcher's cap for that
+    bucket (predict_batch runs a whole batch in one pass), with texts sized
+    in subword tokens. Seeing two sizes per dimension during warm-up lets
+    torch mark batch and sequence dims dynamic, so the in-between shapes of
+    real traffic reuse the warmed graph instead of recompiling per request.
+    """
+    model.model = torch.compile(model.model, dynamic=None)
+    logger.info("Warming compiled GLiNER model")
+    # Distinct labels: inference() dedups repeats, which would shrink the prompt
+    labels = [f"l{i}" for i in range(4)]
+    max_tokens = model.data_processor.transformer_tokenizer.model_max_length
+    for seq_len in _BUCKETS:
+        text = warm_text(min(seq_len, max_tokens), labels)
+        for batch_size in sorted({1, min(MAX_BATCH, CALIB[seq_len])}):
+            predict_batch([text] * batch_size, labels, DEFAULT_THRESHOLD)
+    logger.info("Compiled GLiNER model warmed")
+
+
+def predict_batch(texts: list[str], labels: list[str], threshold: float) -> list:
+    """Run one batched forward pass with this process's model."""
+    kwargs = {}
+    # Packing only removes padding; when every text already fills the
+    # window it just adds mask overhead, so skip it.
+    if packing_config is not None and any(
+        seq_bucket(text) < _BUCKETS[-1] for text in texts
+    ):
+        kwargs["packing_config"] = packing_config
+    with torch.inference_mode(), torch.autocast(
+        "cpu", dtype=torch.bfloat16, enabled=BF16
+    ):
+        # inference() rather than the deprecated batch_predict_entities,
+        # whose default batch_size=8 would re-split the coalesced batch;
+        # the batcher has already sized it by CALIB
+        return model.inference(
+            texts, labels, threshold=threshold, batch_size=len(texts), **kwargs
+        )
+
+
+def cache_key(text: str, labels: tuple[str, ...], threshold: float) -> tuple:
+    """Key inference results on a text digest, label tuple, and threshold.
+
+    Labels keep their request order: GLiNER encodes them into the prompt,
+    so reordering can shift scores.
+    """
+    digest = hashlib.blake2b(text.encode(), digest_size=16).digest()
+    return (digest, labels, round(threshold, 4))
+
+
+def seq_bucket(text: str) -> int:
+    """Return the smallest calibration bucket that fits the text."""
+    length = len(text.split())
+    for bucket in _BUCKETS:
+        if length <= bucket:
+            return bucket
+    return _BUCKETS[-1]
+
+
+async def run_group(
+    pool: Executor, items: list, labels: list[str], threshold: float
+):
+    """Score one label/threshold group on the executor and resolve callers.
+
+    If the batched call fails, each text is retried on its own so that one
+    bad input only fails its own request, not every request batched with it.
+    """
+    loop = asyncio.get_running_loop()
+    texts = [text for text, _, _, _ in items]
+    try:
+        results = await loop.run_in_executor(
+            pool, predict_batch, texts, labels, threshold
+        )
+    except Exception as exc:
+        if len(items) == 1:
+            logger.exception("GLiNER inference failed")
+            if not items[0][3].done():
+                items[0][3].set_exception(exc)
+            return
+        logger.exception("Batched GLiNER inference failed; retrying items individually")
+    else:
+        for (_, _, _, future), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+        return
+
+    for text, _, _, future in items:
+        try:
+            result = await loop.run_in_executor(
+                pool, predict_batch, [text], labels, threshold
+            )
+        except Exception as exc:
+            logger.exception("GLiNER inference failed")
+            if not future.done():
+                future.set_exception(exc)
+        else:
+            if not future.done():
+                future.set_result(result[0])
+
+
+async def server_loop(queue: asyncio.Queue, pool: Executor):
+    """Coalesce queued extraction requests into batched forward passes.
+
+    Each queue item is (text, entity_types, threshold, future). Waits for
+    the first request, then drains up to MAX_BATCH requests that arrive
+    within BATCH_WINDOW. The batch is then capped by CALIB for the longest
+    text drained; overflow is carried into the next batch ahead of newer
+    requests. Requests sharing the same labels and threshold are scored
+    with a single GLiNER inference call on the executor, with at
+    most one batch in flight per worker.
+    """
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(max(1, WORKERS))
+    in_flight: set[asyncio.Task] = set()
+    carry: list = []
+    while True:
+        carried = bool(carry)
+        pending = carry or [await queue.get()]
+        # The window opens when the first request arrives, not before the
+        # idle wait; carried overflow is dispatched without waiting
+        deadline = loop.time() + (0 if carried else BATCH_WINDOW)
+        while len(pending) < MAX_BATCH:
+            try:
+                pending.append(queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                pending.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        cap = CALIB[max(seq_bucket(text) for text, _, _, _ in pending)]
+        pending, carry = pending[:cap], pending[cap:]
+
+        groups: dict[tuple[tuple[str, ...], float], list] = {}
+        for item in pending:
+            _, entity_types, threshold, _ = item
+            groups.setdefault((entity_types, threshold), []).append(item)
+
+        for (labels, threshold), items in groups.items():
+            await slots.acquire()
+            task = asyncio.create_task(run_group(pool, items, list(labels), threshold))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load GLiNER model and start the batching loop on startup."""
+    global executor
+    logger.info(f"Loading GLiNER model: {MODEL_NAME} (backend: {BACKEND})")
+    if WORKERS > 0:
+        # spawn, not fork: forking after torch has started threads is unsafe
+        pool = ProcessPoolExecutor(
+            WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+        )
+        # Start every worker now so model loading happens before serving
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(pool, os.getpid) for _ in range(WORKERS))
+        )
+    else:
+        init_worker()
+        pool = ThreadPoolExecutor(max_workers=1)
     logger.info(f"GLiNER model loaded: {MODEL_NAME}")
+    app.model_queue = asyncio.Queue()
+    batcher = asyncio.create_task(server_loop(app.model_queue, pool))
+    executor = pool
     yield
     logger.info("GLiNER sidecar shutting down")
+    batcher.cancel()
+    # shutdown() waits for running inference; keep that off the event loop
+    await asyncio.to_thread(pool.shutdown, cancel_futures=True)
 
 
 app = FastAPI(title="GLiNER NER Sidecar", lifespan=lifespan)
@@ -79,40 +374,74 @@ async def extract_entities(req: ExtractRequest):
     # but handles longer text via sliding window)
     text = req.text[:MAX_LENGTH]
 
-    # GLiNER predict_entities returns list of dicts
-    raw_entities = model.predict_entities(
-        text, req.entity_types, threshold=req.threshold
-    )
+    labels = tuple(req.entity_types)
+
+    # Queue for the batching loop unless an identical request is cached or
+    # in flight; resolves to GLiNER's list of entity dicts
+    request_key = cache_key(text, labels, req.threshold)
+    future = result_cache.get(request_key)
+    if future is not None:
+        result_cache.move_to_end(request_key)
+    else:
+        future = asyncio.get_running_loop().create_future()
+        if CACHE_SIZE > 0:
+            result_cache[request_key] = future
+            if len(result_cache) > CACHE_SIZE:
+                result_cache.popitem(last=False)
+        await app.model_queue.put((text, labels, req.threshold, future))
+    try:
+        # Shield so one disconnecting client does not cancel shared work
+        raw_entities = await asyncio.shield(future)
+    except Exception:
+        if result_cache.get(request_key) is future:
+            del result_cache[request_key]
+        raise
 
-    # Deduplicate: keep highest-scoring span for overlapping entities
-    seen = set()
-    entities = []
+    # Deduplicate: keep highest-scoring span per (text, label). Callers rank
+    # and tag by entity text, so repeated mentions collapse into one unless
+    # GLINER_DEDUP_OFFSETS=1 keys on (offsets, label) instead.
+    best = {}
     for ent in raw_entities:
-        key = (ent["text"].lower(), ent["label"])
-        if key not in seen:
-            seen.add(key)
-            entities.append(
-                Entity(
-                    text=ent["text"],
-                    label=ent["label"],
-                    score=round(ent["score"], 4),
-                    start=ent.get("start", 0),
-                    end=ent.get("end", 0),
-                )
-            )
+        if DEDUP_OFFSETS:
+            dedup_key = (ent.get("start", 0), ent.get("end", 0), ent["label"])
+        else:
+            dedup_key = (ent["text"].casefold(), ent["label"])
+        cur = best.get(dedup_key)
+        if cur is None or ent["score"] > cur["score"]:
+            best[dedup_key] = ent
+
+    # GLiNER output is trusted, so skip per-field validation
+    entities = [
+        Entity.model_construct(
+            text=ent["text"],
+            label=ent["label"],
+            score=round(ent["score"], 4),
+            start=ent.get("start", 0),
+            end=ent.get("end", 0),
+        )
+        for ent in best.values()
+    ]
 
-    return ExtractResponse(
+    resp = ExtractResponse.model_construct(
         entities=entities,
         model=MODEL_NAME,
         text_length=len(text),
     )
+    # Serialize with pydantic-core's native encoder; returning a Response
+    # skips FastAPI's jsonable_encoder + json.dumps pass
+    return Response(resp.model_dump_json(), media_type="application/json")
 
 
 @app.get("/health")
 async def health():
     """Health check endpoint."""
-    if model is None:
+    if executor is None:
         return JSONResponse({"status": "loading", "model": MODEL_NAME}, status_code=503)
+    # A worker that dies (e.g. OOM-killed) leaves the pool permanently broken;
+    # report it so the container healthcheck restarts the sidecar. There is
+    # no public accessor, and submitting a probe would queue behind inference
+    if getattr(executor, "_broken", False):
+        return JSONResponse({"status": "broken", "model": MODEL_NAME}, status_code=503)
     return {"status": "healthy", "model": MODEL_NAME}
 
 
@@ -5,26 +5,126 @@ Issue #113
 """
 
 import re
+import shutil
 import sys
 from datetime import datetime
 
+# Patterns for the pre-update index.js constructs, compiled once
+_GET_NOTE_HANDLER = re.compile(r'        case "get_note":\s+result = await apiRequest\("GET", `/api/v1/notes/\$\{args\.id\}`\);\s+break;')
+
+_SEARCH_HANDLER = re.compile(r'(case "search_notes": \{.*?if \(args\.set\) params\.set\("set", args\.set\);)', re.DOTALL)
+
+_NOTE_LINKS_HANDLER = re.compile(r'(\s+case "get_note_links":)')
+
+_GET_NOTE_TOOL = re.compile(r'''  \{
+    name: "get_note",
+    description: `Get complete details for a specific note\.
+
+Returns the full note including:
+- Original content \(as submitted\)
+- AI-enhanced revision \(structured, contextual\)
+- Generated title
+- Tags \(user \+ AI-generated\)
+- Semantic links to related notes
+- Metadata and timestamps
+
+Use this to retrieve the full context of a note for analysis or reference\.`,
+    inputSchema: \{
+      type: "object",
+      properties: \{
+        id: \{ type: "string", description: "UUID of the note" \},
+      \},
+      required: \["id"\],
+    \},
+  \},''')
+
+_SEARCH_TOOL = re.compile(r'''  \{
+    name: "search_notes",
+    description: `Search notes using hybrid full-text and semantic search\.
+
+Search modes:
+- 'hybrid' \(default\): Combines keyword matching with semantic similarity for best results
+- 'fts': Full-text search only - exact keyword matching
+- 'semantic': Vector similarity only - finds conceptually related content
+
+Embedding sets:
+- Use 'set' parameter to restrict semantic search to a specific embedding set
+- Omit 'set' to search across all embeddings \(default behavior\)
+- Use list_embedding_sets to discover available sets
+
+Returns ranked results with:
+- note_id: UUID of the matching note
+- score: Relevance score \(0\.0-1\.0\)
+- snippet: Text excerpt showing matching content
+- title: Note title \(for quick identification\)
+- tags: Associated tags \(for context\)
+
+Use semantic mode when looking for conceptually related content even if exact keywords don't match\.`,
+    inputSchema: \{
+      type: "object",
+      properties: \{
+        query: \{ type: "string", description: "Search query \(natural language or keywords\)" \},
+        limit: \{ type: "number", description: "Maximum results \(default: 20\)", default: 20 \},
+        mode: \{ type: "string", enum: \["hybrid", "fts", "semantic"\], description: "Search mode", default: "hybrid" \},
+        set: \{ type: "string", description: "Embedding set slug to restrict semantic search \(optional\)" \},
+      \},
+      required: \["query"\],
+    \},
+  \},''')
+
+_NOTE_LINKS_TOOL = re.compile(r'(  \{\s+name: "get_note_links",.*?\},)\s+(  \{)', re.DOTALL)
+
+
+def find_edit(content, pattern, template):
+    """Locate the first match of pattern in content.
+
+    Returns a (start, end, replacement) edit with template expanded against
+    the match, or None if the pattern does not match.
+    """
+    match = pattern.search(content)
+    if match is None:
+        return None
+    return (match.start(), match.end(), match.expand(template))
+
+
+def apply_edits(content, edits):
+    """Apply non-overlapping (start, end, replacement) edits in one pass."""
+    pieces = []
+    pos = 0
+    for start, end, replacement in sorted(edits):
+        if start < pos:
+            raise ValueError("overlapping edits")
+        pieces.append(content[pos:start])
+        pieces.append(replacement)
+        pos = end
+    pieces.append(content[pos:])
+    return "".join(pieces)
+
+
 def main():
     input_file = 'index.js'
     backup_file = f'index.js.backup-{datetime.now().strftime("%Y%m%d%H%M%S")}'
 
+    # Create backup (kernel-side copy, no round trip through Python)
+    shutil.copyfile(input_file, backup_file)
+    print(f"✓ Created backup: {backup_file}")
+
     # Read the file
     with open(input_file, 'r') as f:
         content = f.read()
 
-    # Create backup
-    with open(backup_file, 'w') as f:
-        f.write(content)
-    print(f"✓ Created backup: {backup_file}")
+    # Every edit is located against the original content and applied
+    # together at the end, so the file is scanned once per pattern
+    # instead of being rewritten after each substitution.
+    edits = []
 
-    original_content = content
+    def collect(pattern, template, message):
+        edit = find_edit(content, pattern, template)
+        if edit is not None:
+            edits.append(edit)
+            print(f"✓ {message}")
 
     # 1. Update get_note handler
-    get_note_handler_old = r'        case "get_note":\s+result = await apiRequest\("GET", `/api/v1/notes/\$\{args\.id\}`\);\s+break;'
     get_note_handler_new = '''        case "get_note": {
           const params = new URLSearchParams();
           if (args.full_document) params.set("full_document", "true");
@@ -33,19 +133,12 @@ def main():
           break;
         }'''
 
-    content = re.sub(get_note_handler_old, get_note_handler_new, content)
-    if content != original_content:
-        print("✓ Updated get_note handler")
-        original_content = content
+    collect(_GET_NOTE_HANDLER, get_note_handler_new, "Updated get_note handler")
 
     # 2. Update search_notes handler
-    search_handler_find = r'(case "search_notes": \{.*?if \(args\.set\) params\.set\("set", args\.set\);)'
     search_handler_replace = r'\1\n          if (args.deduplicate_chains !== undefined) params.set("deduplicate_chains", args.deduplicate_chains);\n          if (args.expand_chains) params.set("expand_chains", "true");'
 
-    content = re.sub(search_handler_find, search_handler_replace, content, flags=re.DOTALL)
-    if content != original_content:
-        print("✓ Updated search_notes handler")
-        original_content = content
+    collect(_SEARCH_HANDLER, search_handler_replace, "Updated search_notes handler")
 
     # 3. Add get_document_chain handler
     doc_chain_handler = '''
@@ -59,34 +152,9 @@ def main():
 
         '''
 
-    content = re.sub(r'(\s+case "get_note_links":)', doc_chain_handler + r'\1', content, count=1)
-    if content != original_content:
-        print("✓ Added get_document_chain handler")
-        original_content = content
+    collect(_NOTE_LINKS_HANDLER, doc_chain_handler + r'\1', "Added get_document_chain handler")
 
     # 4. Update get_note tool schema
-    get_note_tool_old = r'''  \{
-    name: "get_note",
-    description: `Get complete details for a specific note\.
-
-Returns the full note including:
-- Original content \(as submitted\)
-- AI-enhanced revision \(structured, contextual\)
-- Generated title
-- Tags \(user \+ AI-generated\)
-- Semantic links to related notes
-- Metadata and timestamps
-
-Use this to retrieve the full context of a note for analysis or reference\.`,
-    inputSchema: \{
-      type: "object",
-      properties: \{
-        id: \{ type: "string", description: "UUID of the note" \},
-      \},
-      required: \["id"\],
-    \},
-  \},'''
-
     get_note_tool_new = '''  {
     name: "get_note",
     description: `Get complete details for a specific note.
@@ -119,46 +187,9 @@ Use this to retrieve the full context of a note for analysis or reference.`,
     },
   },'''
 
-    content = re.sub(get_note_tool_old, get_note_tool_new, content)
-    if content != original_content:
-        print("✓ Updated get_note tool schema")
-        original_content = content
+    collect(_GET_NOTE_TOOL, get_note_tool_new, "Updated get_note tool schema")
 
     # 5. Update search_notes tool schema
-    search_tool_pattern = r'''  \{
-    name: "search_notes",
-    description: `Search notes using hybrid full-text and semantic search\.
-
-Search modes:
-- 'hybrid' \(default\): Combines keyword matching with semantic similarity for best results
-- 'fts': Full-text search only - exact keyword matching
-- 'semantic': Vector similarity only - finds conceptually related content
-
-Embedding sets:
-- Use 'set' parameter to restrict semantic search to a specific embedding set
-- Omit 'set' to search across all embeddings \(default behavior\)
-- Use list_embedding_sets to discover available sets
-
-Returns ranked results with:
-- note_id: UUID of the matching note
-- score: Relevance score \(0\.0-1\.0\)
-- snippet: Text excerpt showing matching content
-- title: Note title \(for quick identification\)
-- tags: Associated tags \(for context\)
-
-Use semantic mode when looking for conceptually related content even if exact keywords don't match\.`,
-    inputSchema: \{
-      type: "object",
-      properties: \{
-        query: \{ type: "string", description: "Search query \(natural language or keywords\)" \},
-        limit: \{ type: "number", description: "Maximum results \(default: 20\)", default: 20 \},
-        mode: \{ type: "string", enum: \["hybrid", "fts", "semantic"\], description: "Search mode", default: "hybrid" \},
-        set: \{ type: "string", description: "Embedding set slug to restrict semantic search \(optional\)" \},
-      \},
-      required: \["query"\],
-    \},
-  \},'''
-
     search_tool_new = '''  {
     name: "search_notes",
     description: `Search notes using hybrid full-text and semantic search.
@@ -208,10 +239,7 @@ Use semantic mode when looking for conceptually related content even if exact ke
     },
   },'''
 
-    content = re.sub(search_tool_pattern, search_tool_new, content)
-    if content != original_content:
-        print("✓ Updated search_notes tool schema")
-        original_content = content
+    collect(_SEARCH_TOOL, search_tool_new, "Updated search_notes tool schema")
 
     # 6. Add get_document_chain tool after get_note_links
     doc_chain_tool = ''',
@@ -253,12 +281,10 @@ USE WHEN:
   }'''
 
     # Find get_note_links tool and add after it
-    pattern = r'(  \{\s+name: "get_note_links",.*?\},)\s+(  \{)'
     replacement = r'\1' + doc_chain_tool + r'\n\2'
-    content = re.sub(pattern, replacement, content, flags=re.DOTALL)
-    if content != original_content:
-        print("✓ Added get_document_chain tool")
-        original_content = content
+    collect(_NOTE_LINKS_TOOL, replacement, "Added get_document_chain tool")
+
+    content = apply_edits(content, edits)
 
     # Write updated content
     with open(input_file, 'w') as f:
@@ -2,9 +2,14 @@
 """
 Batch Context Length Testing - Tests multiple models efficiently.
 Finds the breaking point for each model.
+
+Models run one after another by default. --parallel=N probes N at once,
+which is only meaningful when they do not share one Ollama/GPU: probes
+failing from contention are read as context limits.
 """
 
-import requests
+import aiohttp
+import asyncio
 import time
 import json
 import sys
@@ -12,31 +17,32 @@ from datetime import datetime
 
 OLLAMA_URL = "http://localhost:11434"
 
-def test_context(model: str, num_ctx: int, timeout: int = 300) -> tuple:
+# Largest probe prompt, built once; smaller probes slice a prefix of it
+MAX_CTX = 524288
+_MAX_PROMPT = "test " * (MAX_CTX // 2)
+
+async def test_context(session: aiohttp.ClientSession, model: str, num_ctx: int, timeout: int = 300) -> tuple:
     """Test a specific context size. Returns (success, tokens_processed, time_seconds)."""
-    prompt = "test " * (num_ctx // 2)
+    prompt = _MAX_PROMPT[:(num_ctx // 2) * 5]
     try:
         start = time.time()
-        resp = requests.post(f'{OLLAMA_URL}/api/generate', json={
+        async with session.post(f'{OLLAMA_URL}/api/generate', json={
             'model': model,
             'prompt': f'Summarize: {prompt}',
             'stream': False,
-            'options': {'num_ctx': num_ctx, 'num_predict': 10}
-        }, timeout=timeout)
-        elapsed = time.time() - start
-
-        if resp.status_code == 200:
-            data = resp.json()
-            return True, data.get('prompt_eval_count', 0), elapsed
-        return False, f"HTTP {resp.status_code}", 0
+            # Only prompt ingestion matters; one output token keeps probes cheap
+            'options': {'num_ctx': num_ctx, 'num_predict': 1}
+        }, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+            if resp.status == 200:
+                data = await resp.json()
+                return True, data.get('prompt_eval_count', 0), time.time() - start
+            return False, f"HTTP {resp.status}", 0
     except Exception as e:
-        return False, str(e)[:50], 0
+        return False, str(e)[:50] or type(e).__name__, 0
 
-def find_max_context(model: str) -> dict:
+async def find_max_context(session: aiohttp.ClientSession, model: str) -> dict:
     """Binary search to find max context for a model."""
-    print(f"\n{'='*60}")
-    print(f"Testing: {model}")
-    print(f"{'='*60}")
+    print(f"[{model}] Testing...")
 
     result = {
         "model": model,
@@ -44,15 +50,17 @@ def find_max_context(model: str) -> dict:
         "tests": []
     }
 
-    # Test increasing context sizes until failure
-    context_sizes = [4096, 8192, 16384, 32768, 65536, 131072, 196608, 262144, 524288]
+    # Bisect over power-of-two context sizes, 4K (2**12) to 512K (2**19).
+    # The first probe is always 4K so broken models are rejected early.
+    lo, hi = 12, 19
 
     max_successful = 0
     max_tokens = 0
 
-    for ctx in context_sizes:
-        print(f"  Testing {ctx//1024}K...", end=" ", flush=True)
-        ok, tokens_or_error, elapsed = test_context(model, ctx)
+    while lo <= hi:
+        exp = (lo + hi) // 2 if result["tests"] else lo
+        ctx = 1 << exp
+        ok, tokens_or_error, elapsed = await test_context(session, model, ctx)
 
         test_record = {
             "num_ctx": ctx,
@@ -60,16 +68,16 @@ def find_max_context(model: str) -> dict:
         }
 
         if ok:
-            print(f"OK ({tokens_or_error} tokens, {elapsed:.1f}s)")
+            print(f"[{model}] {ctx//1024}K OK ({tokens_or_error} tokens, {elapsed:.1f}s)")
             max_successful = ctx
             max_tokens = tokens_or_error
             test_record["tokens"] = tokens_or_error
             test_record["time_s"] = round(elapsed, 2)
+            lo = exp + 1
         else:
-            print(f"FAILED - {tokens_or_error}")
+            print(f"[{model}] {ctx//1024}K FAILED - {tokens_or_error}")
             test_record["error"] = tokens_or_error
-            result["tests"].append(test_record)
-            break
+            hi = exp - 1
 
         result["tests"].append(test_record)
 
@@ -77,14 +85,42 @@ def find_max_context(model: str) -> dict:
     result["max_tokens"] = max_tokens
     result["recommended_ctx"] = int(max_successful * 0.85)  # 85% safety margin
 
-    print(f"\n  Max num_ctx: {max_successful} ({max_successful//1024}K)")
-    print(f"  Max tokens:  {max_tokens}")
-    print(f"  Recommended: {result['recommended_ctx']} ({result['recommended_ctx']//1024}K)")
+    print(f"[{model}] Max num_ctx: {max_successful} ({max_successful//1024}K), "
+          f"max tokens: {max_tokens}, "
+          f"recommended: {result['recommended_ctx']} ({result['recommended_ctx']//1024}K)")
+
+    return result
+
+async def test_model(session: aiohttp.ClientSession, sem: asyncio.Semaphore, model: str, ndjson) -> dict:
+    """Run find_max_context for one model, bounded by the shared semaphore.
 
+    The result is written to ndjson as soon as the model finishes, so a
+    later hang or crash does not lose it.
+    """
+    async with sem:
+        try:
+            result = await find_max_context(session, model)
+        except Exception as e:
+            print(f"Error testing {model}: {e}")
+            result = {
+                "model": model,
+                "error": str(e),
+                "timestamp": datetime.now().isoformat()
+            }
+    # One compact JSON line per model
+    ndjson.write(json.dumps(result, separators=(",", ":")) + "\n")
     return result
 
-def main():
-    models = sys.argv[1:] if len(sys.argv) > 1 else [
+async def main():
+    parallel = 1
+    models = []
+    for arg in sys.argv[1:]:
+        if arg.startswith("--parallel="):
+            parallel = max(1, int(arg.split("=", 1)[1]))
+        elif not arg.startswith("-"):
+            models.append(arg)
+
+    models = models or [
         "qwen2.5:14b",
         "qwen2.5-coder:14b",
         "gemma2:9b",
@@ -99,19 +135,12 @@ def main():
     print(f"Models to test: {len(models)}")
     print("="*60)
 
-    all_results = []
+    output_file = f"/home/roctinam/dev/fortemi/docs/research/batch_context_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
 
-    for model in models:
-        try:
-            result = find_max_context(model)
-            all_results.append(result)
-        except Exception as e:
-            print(f"Error testing {model}: {e}")
-            all_results.append({
-                "model": model,
-                "error": str(e),
-                "timestamp": datetime.now().isoformat()
-            })
+    sem = asyncio.Semaphore(parallel)
+    with open(output_file, 'w', buffering=1) as ndjson:
+        async with aiohttp.ClientSession() as session:
+            all_results = await asyncio.gather(*[test_model(session, sem, model, ndjson) for model in models])
 
     # Summary
     print("\n" + "="*60)
@@ -126,13 +155,9 @@ def main():
         else:
             print(f"{r['model']:<30} {r.get('max_num_ctx', 0)//1024:>7}K {r.get('max_tokens', 0):>12} {r.get('recommended_ctx', 0)//1024:>9}K")
 
-    # Save results
-    output_file = f"/home/roctinam/dev/fortemi/docs/research/batch_context_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(output_file, 'w') as f:
-        json.dump(all_results, f, indent=2)
     print(f"\nResults saved to: {output_file}")
 
     return all_results
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
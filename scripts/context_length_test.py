@@ -18,6 +18,11 @@ from typing import Optional
 
 OLLAMA_URL = "http://localhost:11434"
 
+# Padding sentence (~12 tokens), pre-repeated to cover the largest
+# num_ctx probe (128K) so prompts are sliced instead of rebuilt
+PADDING_BASE = "The quick brown fox jumps over the lazy dog. "
+_MAX_PADDING = PADDING_BASE * (131072 // 12)
+
 def get_models():
     """Get list of installed models."""
     resp = requests.get(f"{OLLAMA_URL}/api/tags")
@@ -29,9 +34,12 @@ def count_tokens_approx(text):
 
 def generate_test_prompt(target_tokens):
     """Generate a prompt with approximately target_tokens tokens."""
-    base = "The quick brown fox jumps over the lazy dog. "  # ~12 tokens
     repeats = max(1, target_tokens // 12)
-    padding = base * repeats
+    size = len(PADDING_BASE) * repeats
+    if size <= len(_MAX_PADDING):
+        padding = _MAX_PADDING[:size]
+    else:
+        padding = PADDING_BASE * repeats
 
     prompt = f"""Please summarize the following text in 2-3 sentences:
 
@@ -238,22 +246,29 @@ def main():
     if not models_to_test:
         models_to_test = ["gpt-oss:20b"]  # Default
 
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    output_file = f"/home/roctinam/dev/fortemi/docs/research/context_length_results_{timestamp}.jsonl"
+
     all_results = []
 
-    for model in models_to_test:
-        try:
-            if comprehensive:
-                results = test_model_comprehensive(model)
-            else:
-                results = find_max_context(model)
+    # Stream each model's results as they finish so a crash keeps prior data
+    with open(output_file, 'w', buffering=1) as ndjson:
+        for model in models_to_test:
+            try:
+                if comprehensive:
+                    results = test_model_comprehensive(model)
+                else:
+                    results = find_max_context(model)
+            except Exception as e:
+                print(f"Error testing {model}: {e}")
+                results = {
+                    "model": model,
+                    "error": str(e),
+                    "timestamp": datetime.now().isoformat()
+                }
+            # One compact JSON line per model
+            ndjson.write(json.dumps(results, separators=(",", ":")) + "\n")
             all_results.append(results)
-        except Exception as e:
-            print(f"Error testing {model}: {e}")
-            all_results.append({
-                "model": model,
-                "error": str(e),
-                "timestamp": datetime.now().isoformat()
-            })
 
     # Summary
     print("\n" + "="*60)
@@ -275,11 +290,6 @@ def main():
             avg_tps = sum(p["tokens_per_sec"] for p in r["performance"]) / len(r["performance"])
             print(f"  Avg throughput:      {avg_tps:.1f} tok/s")
 
-    # Save results
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    output_file = f"/home/roctinam/dev/fortemi/docs/research/context_length_results_{timestamp}.json"
-    with open(output_file, 'w') as f:
-        json.dump(all_results, f, indent=2)
     print(f"\nResults saved to: {output_file}")
 
     return all_results
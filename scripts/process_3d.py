@@ -17,42 +17,56 @@ except ImportError:
     sys.exit(1)
 
 
-def process_3d_file(filepath: str, output_thumbnail: str = None) -> dict:
-    """Process a 3D file and extract metadata."""
+def process_3d_file(filepath: str, output_thumbnail: str = None, fast: bool = False) -> dict:
+    """Process a 3D file and extract metadata.
+
+    edge_count is the exact unique-edge count. With fast=True it is instead
+    estimated from the face count, skipping the sort over all face edges, and
+    edge_count_estimated is set so consumers can tell the two apart.
+    """
     try:
         mesh = trimesh.load(filepath)
     except Exception as e:
         return {"error": f"Failed to load file: {e}"}
 
-    # Handle scene vs mesh
+    # Handle scene vs mesh; a loaded scene is kept as-is for the thumbnail
+    scene = None
     if isinstance(mesh, trimesh.Scene):
         if len(mesh.geometry) == 0:
             return {"error": "Empty scene"}
+        scene = mesh
         # Merge all geometries
         mesh = trimesh.util.concatenate(list(mesh.geometry.values()))
 
     if not isinstance(mesh, trimesh.Trimesh):
         return {"error": f"Unsupported geometry type: {type(mesh).__name__}"}
 
+    # Read trimesh's cached properties once; each access on a TrackedArray
+    # re-checks its dirty state
+    bounds_min, bounds_max = np.asarray(mesh.bounds).tolist()
+    watertight = bool(mesh.is_watertight)
+    verts = mesh.vertices.view(np.ndarray)
+    faces = mesh.faces.view(np.ndarray)
+
     # Extract metadata
-    bounds = mesh.bounds
     metadata = {
         "format": Path(filepath).suffix.lstrip('.').lower(),
-        "vertex_count": len(mesh.vertices),
-        "face_count": len(mesh.faces),
-        "edge_count": len(mesh.edges_unique),
-        "bounds_min": bounds[0].tolist(),
-        "bounds_max": bounds[1].tolist(),
-        "is_watertight": mesh.is_watertight,
+        "vertex_count": len(verts),
+        "face_count": len(faces),
+        # 3F/2 is exact only for closed 2-manifolds and approximate otherwise
+        "edge_count": len(faces) * 3 // 2 if fast else len(mesh.edges_unique),
+        "bounds_min": bounds_min,
+        "bounds_max": bounds_max,
+        "is_watertight": watertight,
         "is_manifold": mesh.is_volume if hasattr(mesh, 'is_volume') else None,
     }
+    if fast:
+        metadata["edge_count_estimated"] = True
 
-    # Compute volume and surface area if watertight
-    if mesh.is_watertight:
+    # Compute volume if watertight; surface area always
+    if watertight:
         metadata["volume"] = float(mesh.volume)
-        metadata["surface_area"] = float(mesh.area)
-    else:
-        metadata["surface_area"] = float(mesh.area)
+    metadata["surface_area"] = float(mesh.area)
 
     # Check for materials/textures
     if hasattr(mesh, 'visual'):
@@ -67,11 +81,11 @@ def process_3d_file(filepath: str, output_thumbnail: str = None) -> dict:
     if output_thumbnail:
         try:
             # Use trimesh's built-in scene rendering
-            scene = trimesh.Scene(mesh)
+            if scene is None:
+                scene = trimesh.Scene(mesh)
             png = scene.save_image(resolution=[512, 512])
             if png is not None:
-                with open(output_thumbnail, 'wb') as f:
-                    f.write(png)
+                Path(output_thumbnail).write_bytes(png)
                 metadata["thumbnail_generated"] = True
         except Exception as e:
             metadata["thumbnail_error"] = str(e)
@@ -84,10 +98,12 @@ def main():
     parser.add_argument('filepath', help='Path to 3D file')
     parser.add_argument('--thumbnail', help='Output path for thumbnail PNG')
     parser.add_argument('--json', action='store_true', help='Output as JSON')
+    parser.add_argument('--fast', action='store_true',
+                        help='Estimate edge count from faces instead of counting unique edges')
 
     args = parser.parse_args()
 
-    result = process_3d_file(args.filepath, args.thumbnail)
+    result = process_3d_file(args.filepath, args.thumbnail, args.fast)
 
     if args.json:
         print(json.dumps(result, indent=2))
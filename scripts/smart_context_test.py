@@ -4,20 +4,33 @@ Smart Context Length Testing - Efficiently finds native context limits.
 Stops testing once truncation is detected or hardware limit is reached.
 """
 
+import functools
+import io
 import requests
 import time
-import json
+import orjson
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 OLLAMA_URL = "http://localhost:11434"
 
+# Shared keep-alive session; the pool covers the concurrent model workers
+SESSION = requests.Session()
+SESSION.mount("http://", requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=16))
+
+# Largest num_ctx probed by find_native_limit
+MAX_CTX = 196608
+
+# Probe prompts by num_ctx, shared across models
+_PROMPT_CACHE: dict[int, str] = {}
+
 def get_model_info(model: str) -> dict:
     """Get model details from Ollama."""
     try:
-        resp = requests.post(f'{OLLAMA_URL}/api/show', json={'name': model}, timeout=30)
+        resp = SESSION.post(f'{OLLAMA_URL}/api/show', json={'name': model}, timeout=30)
         if resp.status_code == 200:
-            data = resp.json()
+            data = orjson.loads(resp.content)
             # Try to find context_length in parameters
             params = data.get('parameters', '')
             details = data.get('details', {})
@@ -34,12 +47,13 @@ def get_model_info(model: str) -> dict:
 def test_context(model: str, num_ctx: int, timeout: int = 300) -> dict:
     """Test context with given num_ctx. Returns actual tokens processed."""
     # Generate prompt slightly larger than num_ctx to detect truncation
-    prompt = "test " * (num_ctx // 2)
-    input_approx = len(prompt) // 4  # Rough token estimate
+    prompt = _PROMPT_CACHE.get(num_ctx) or _PROMPT_CACHE.setdefault(num_ctx, "test " * (num_ctx // 2))
+    # Rough token estimate: "test " is 5 chars, ~4 chars per token
+    input_approx = (num_ctx // 2) * 5 // 4
 
     try:
         start = time.time()
-        resp = requests.post(f'{OLLAMA_URL}/api/generate', json={
+        resp = SESSION.post(f'{OLLAMA_URL}/api/generate', json={
             'model': model,
             'prompt': f'Summarize: {prompt}',
             'stream': False,
@@ -48,54 +62,60 @@ def test_context(model: str, num_ctx: int, timeout: int = 300) -> dict:
         elapsed = time.time() - start
 
         if resp.status_code == 200:
-            data = resp.json()
+            data = orjson.loads(resp.content)
             tokens = data.get('prompt_eval_count', 0)
             return {
                 'success': True,
                 'input_approx': input_approx,
                 'tokens_processed': tokens,
-                'truncated': tokens < input_approx * 0.8,  # >20% loss = truncation
+                'truncated': tokens * 5 < input_approx * 4,  # >20% loss = truncation
                 'time_s': round(elapsed, 2)
             }
         return {'success': False, 'error': f"HTTP {resp.status_code}"}
     except Exception as e:
         return {'success': False, 'error': str(e)[:50]}
 
-def find_native_limit(model: str) -> dict:
+def find_native_limit(model: str, log=print) -> dict:
     """Find the model's native context limit efficiently."""
-    print(f"\n{'='*60}")
-    print(f"Testing: {model}")
-    print(f"{'='*60}")
+    log(f"\n{'='*60}")
+    log(f"Testing: {model}")
+    log(f"{'='*60}")
 
     # Get declared info
     info = get_model_info(model)
-    print(f"  Family: {info.get('family', 'unknown')}")
-    print(f"  Size: {info.get('parameter_size', 'unknown')}")
+    log(f"  Family: {info.get('family', 'unknown')}")
+    log(f"  Size: {info.get('parameter_size', 'unknown')}")
     if info.get('context_length'):
-        print(f"  Declared context: {info['context_length']}")
+        log(f"  Declared context: {info['context_length']}")
 
     result = {
         "model": model,
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
         "info": info,
         "tests": []
     }
 
-    # Test increasing sizes
-    test_sizes = [4096, 8192, 16384, 32768, 65536, 131072, 196608]
+    def probe(num_ctx: int) -> dict:
+        log(f"  Testing {num_ctx//1024}K...", end=" ", flush=True)
+        test = test_context(model, num_ctx)
+        result["tests"].append({**test, 'num_ctx': num_ctx})
+        return test
 
     prev_tokens = 0
     native_limit = 0
     hardware_limit = 0
+    # Largest num_ctx that processed fully, and the first that failed
+    last_ok, first_bad = 0, None
 
-    for num_ctx in test_sizes:
-        print(f"  Testing {num_ctx//1024}K...", end=" ", flush=True)
-        test = test_context(model, num_ctx)
-        result["tests"].append({**test, 'num_ctx': num_ctx})
+    # Double num_ctx until a probe fails, truncates, or plateaus
+    num_ctx = 4096
+    while True:
+        test = probe(num_ctx)
 
         if not test['success']:
-            print(f"FAILED - {test.get('error')}")
+            log(f"FAILED - {test.get('error')}")
             hardware_limit = prev_tokens
+            first_bad = num_ctx
             break
 
         tokens = test['tokens_processed']
@@ -103,55 +123,86 @@ def find_native_limit(model: str) -> dict:
         if test.get('truncated'):
             # Found native limit - it's capped at previous token count
             native_limit = tokens
-            print(f"NATIVE LIMIT FOUND: {tokens} tokens")
+            log(f"NATIVE LIMIT FOUND: {tokens} tokens")
             break
 
         # Check if we've plateaued (same tokens as last test = native limit)
         if tokens <= prev_tokens * 1.1 and prev_tokens > 0:
             native_limit = tokens
-            print(f"PLATEAU at {tokens} tokens (native limit)")
+            log(f"PLATEAU at {tokens} tokens (native limit)")
             break
 
         prev_tokens = tokens
         native_limit = tokens
-        print(f"OK ({tokens} tokens, {test['time_s']}s)")
+        last_ok = num_ctx
+        log(f"OK ({tokens} tokens, {test['time_s']}s)")
+
+        if num_ctx >= MAX_CTX:
+            break
+        num_ctx = min(num_ctx * 2, MAX_CTX)
+
+    # A hardware failure only brackets the limit, so bisect between the
+    # last OK probe and the failing one to pin it within 2K. (A truncated
+    # probe already reports the native cap, so needs no refinement.)
+    while last_ok and first_bad and first_bad - last_ok >= 2048:
+        mid = (last_ok + first_bad) // 2
+        test = probe(mid)
+
+        if not test['success']:
+            log(f"FAILED - {test.get('error')}")
+            first_bad = mid
+        elif test.get('truncated'):
+            native_limit = test['tokens_processed']
+            log(f"NATIVE LIMIT FOUND: {native_limit} tokens")
+            break
+        else:
+            tokens = test['tokens_processed']
+            native_limit = hardware_limit = tokens
+            last_ok = mid
+            log(f"OK ({tokens} tokens, {test['time_s']}s)")
 
     result["native_context"] = native_limit
     result["hardware_limit"] = hardware_limit if hardware_limit else "not reached"
     result["recommended_input"] = int(native_limit * 0.9)
 
-    print(f"\n  Native context limit: {native_limit} tokens")
-    print(f"  Recommended input:    {result['recommended_input']} tokens")
+    log(f"\n  Native context limit: {native_limit} tokens")
+    log(f"  Recommended input:    {result['recommended_input']} tokens")
 
     return result
 
-def test_output_limit(model: str, num_ctx: int = 32768) -> dict:
-    """Test maximum output generation."""
-    print(f"\n  Testing output limit...")
+OUTPUT_PROMPT = "Write a very long detailed technical document. Include many sections, subsections, and detailed explanations. Continue until you reach your maximum. Section 1:"
 
-    prompt = "Write a very long detailed technical document. Include many sections, subsections, and detailed explanations. Continue until you reach your maximum. Section 1:"
+# Pre-serialized /api/generate body for test_output_limit; only the model
+# (JSON-encoded), num_ctx and num_predict are substituted per request
+_OUTPUT_BODY = (
+    b'{"model":%s,"prompt":' + orjson.dumps(OUTPUT_PROMPT)
+    + b',"stream":false,"options":{"num_ctx":%d,"num_predict":%d}}'
+)
+_JSON_HEADERS = {"Content-Type": "application/json"}
 
+def test_output_limit(model: str, num_ctx: int = 32768, log=print) -> dict:
+    """Test maximum output generation."""
+    log(f"\n  Testing output limit...")
+
+    model_json = orjson.dumps(model)
     result = {"tests": []}
     max_output = 0
 
     for num_predict in [1024, 2048, 4096, 8192, 16384]:
-        print(f"    num_predict={num_predict}...", end=" ", flush=True)
+        log(f"    num_predict={num_predict}...", end=" ", flush=True)
 
         try:
             start = time.time()
-            resp = requests.post(f'{OLLAMA_URL}/api/generate', json={
-                'model': model,
-                'prompt': prompt,
-                'stream': False,
-                'options': {
-                    'num_ctx': num_ctx,
-                    'num_predict': num_predict
-                }
-            }, timeout=600)
+            resp = SESSION.post(
+                f'{OLLAMA_URL}/api/generate',
+                data=_OUTPUT_BODY % (model_json, num_ctx, num_predict),
+                headers=_JSON_HEADERS,
+                timeout=600,
+            )
             elapsed = time.time() - start
 
             if resp.status_code == 200:
-                data = resp.json()
+                data = orjson.loads(resp.content)
                 output_tokens = data.get('eval_count', 0)
 
                 test_record = {
@@ -162,52 +213,84 @@ def test_output_limit(model: str, num_ctx: int = 32768) -> dict:
                 }
                 result["tests"].append(test_record)
 
-                print(f"{output_tokens} tokens ({test_record['tok_per_sec']} tok/s)")
+                log(f"{output_tokens} tokens ({test_record['tok_per_sec']} tok/s)")
 
                 # If output < requested and not growing, we've hit the limit
                 if output_tokens < num_predict and output_tokens <= max_output * 1.1:
-                    print(f"    Output limit found: {output_tokens}")
+                    log(f"    Output limit found: {output_tokens}")
                     break
 
                 max_output = max(max_output, output_tokens)
             else:
-                print(f"FAILED")
+                log(f"FAILED")
                 break
         except Exception as e:
-            print(f"ERROR: {e}")
+            log(f"ERROR: {e}")
             break
 
     result["max_output"] = max_output
     return result
 
-def test_model_complete(model: str) -> dict:
+def test_model_complete(model: str, log=print) -> dict:
     """Complete test: native context + output limit."""
-    result = find_native_limit(model)
+    result = find_native_limit(model, log)
 
     # Use found native limit for output testing
     ctx = min(result.get('native_context', 8192), 131072)
-    output_result = test_output_limit(model, ctx)
+    output_result = test_output_limit(model, ctx, log)
     result["output"] = output_result
 
     return result
 
 def main():
-    models = sys.argv[1:] if len(sys.argv) > 1 else ["gpt-oss:20b"]
+    # --parallel=N tests N models at once
+    parallel = 1
+    models = []
+    for arg in sys.argv[1:]:
+        if arg.startswith("--parallel="):
+            parallel = max(1, int(arg.split("=", 1)[1]))
+        elif not arg.startswith("-"):
+            models.append(arg)
+    models = models or ["gpt-oss:20b"]
 
     print("="*60)
     print("SMART CONTEXT & OUTPUT TESTING")
-    print(f"Started: {datetime.now().isoformat()}")
+    started = datetime.now()
+    print(f"Started: {started.isoformat(timespec='seconds')}")
     print("="*60)
 
-    all_results = []
+    output_file = f"/home/roctinam/dev/fortemi/docs/research/smart_context_results_{started:%Y%m%d_%H%M%S}.jsonl"
 
-    for model in models:
+    def test_one(model):
+        out = io.StringIO()
+        log = functools.partial(print, file=out)
         try:
-            result = test_model_complete(model)
-            all_results.append(result)
+            result = test_model_complete(model, log)
         except Exception as e:
-            print(f"Error testing {model}: {e}")
-            all_results.append({"model": model, "error": str(e)})
+            log(f"Error testing {model}: {e}")
+            result = {"model": model, "error": str(e)}
+        return result, out.getvalue()
+
+    # One model at a time by default: concurrent probes on a shared Ollama
+    # fail from contention (read as hardware limits) and skew tok/s. Each
+    # worker returns its buffered output, which is printed in input order.
+    # Only a summary row is kept per model; full results go straight to disk
+    summary_rows = []
+    with open(output_file, 'wb') as f, ThreadPoolExecutor(max_workers=min(len(models), parallel)) as ex:
+        for r, output in ex.map(test_one, models):
+            print(output, end="", flush=True)
+            # One JSON line per model, flushed so a crash keeps prior results
+            f.write(orjson.dumps(r) + b"\n")
+            f.flush()
+            if r.get('error'):
+                summary_rows.append((r['model'], None))
+            else:
+                tests = r.get('output', {}).get('tests')
+                summary_rows.append((r['model'], (
+                    r.get('native_context', 0),
+                    r.get('output', {}).get('max_output', 0),
+                    tests[-1].get('tok_per_sec', 0) if tests else 0,
+                )))
 
     # Summary
     print("\n" + "="*60)
@@ -216,22 +299,16 @@ def main():
     print(f"\n{'Model':<25} {'Native CTX':>12} {'Max Output':>12} {'Output tok/s':>12}")
     print("-"*65)
 
-    for r in all_results:
-        if r.get('error'):
-            print(f"{r['model']:<25} ERROR")
+    for model, row in summary_rows:
+        if row is None:
+            print(f"{model:<25} ERROR")
         else:
-            native = r.get('native_context', 0)
-            output = r.get('output', {}).get('max_output', 0)
-            tok_s = r.get('output', {}).get('tests', [{}])[-1].get('tok_per_sec', 0) if r.get('output', {}).get('tests') else 0
-            print(f"{r['model']:<25} {native:>12} {output:>12} {tok_s:>12}")
-
-    # Save
-    output_file = f"/home/roctinam/dev/fortemi/docs/research/smart_context_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(output_file, 'w') as f:
-        json.dump(all_results, f, indent=2)
+            native, output, tok_s = row
+            print(f"{model:<25} {native:>12} {output:>12} {tok_s:>12}")
+
     print(f"\nResults saved to: {output_file}")
 
-    return all_results
+    return summary_rows
 
 if __name__ == "__main__":
     main()
@@ -8,10 +8,12 @@ Detects if a model has reasoning/thinking capabilities by:
 3. Measuring thinking overhead (output much longer than expected)
 """
 
-import requests
-import json
+import aiohttp
+import asyncio
+import orjson
 import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 OLLAMA_URL = "http://localhost:11434"
@@ -28,8 +30,8 @@ THINKING_PROMPTS = [
     "If all roses are flowers, and some flowers fade quickly, can we conclude that some roses fade quickly? Reason through this carefully.",
 ]
 
-# Patterns that indicate thinking mode
-THINKING_PATTERNS = [
+# Patterns that indicate thinking mode (compiled once, case-insensitive)
+THINKING_PATTERNS = [re.compile(p, re.IGNORECASE) for p in [
     r'<think>',
     r'</think>',
     r'<reasoning>',
@@ -46,14 +48,55 @@ THINKING_PATTERNS = [
     r'I should',
     r'Breaking this down',
     r'To solve this',
-]
-
-def test_thinking_capability(model: str, timeout: int = 120) -> dict:
-    """Test if a model has thinking/reasoning capabilities."""
+]]
+
+# All thinking patterns in a single scan. Each alternative sits in a
+# lookahead so matches never consume text another pattern needs; the
+# named group that fired (p<index>) maps back to THINKING_PATTERNS.
+COMBINED_RE = re.compile(
+    "|".join(f"(?=(?P<p{i}>{pat.pattern}))" for i, pat in enumerate(THINKING_PATTERNS)),
+    re.IGNORECASE,
+)
+
+def find_thinking_patterns(response: str) -> list:
+    """Return the THINKING_PATTERNS strings found in response, in list order."""
+    found = set()
+    for m in COMBINED_RE.finditer(response):
+        found.add(int(m.lastgroup[1:]))
+        if len(found) == len(THINKING_PATTERNS):
+            break
+    return [THINKING_PATTERNS[i].pattern for i in sorted(found)]
+
+# Explicit thinking tags
+TAG_RE = re.compile(r'<think>|</think>|<reasoning>|</reasoning>', re.IGNORECASE)
+
+async def _run_prompt(session: aiohttp.ClientSession, model: str, prompt: str, timeout: int) -> tuple:
+    """Send one thinking prompt. Returns (http_status, parsed_response_or_None)."""
+    # First try raw mode to catch hidden thinking tags
+    async with session.post(f'{OLLAMA_URL}/api/generate', json={
+        'model': model,
+        'prompt': prompt,
+        'stream': False,
+        'raw': True,  # Raw mode to preserve thinking tags
+        'options': {
+            'num_ctx': 8192,
+            'num_predict': 2048,  # Allow room for thinking
+            'temperature': 0.7
+        }
+    }, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+        if resp.status == 200:
+            return resp.status, orjson.loads(await resp.read())
+        return resp.status, None
+
+async def test_thinking_capability(model: str, timeout: int = 120, log=print) -> dict:
+    """Test if a model has thinking/reasoning capabilities.
+
+    Progress lines go to log (print by default).
+    """
 
     result = {
         "model": model,
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
         "is_thinking_model": False,
         "thinking_patterns_found": [],
         "thinking_tags_found": False,
@@ -61,70 +104,64 @@ def test_thinking_capability(model: str, timeout: int = 120) -> dict:
         "tests": []
     }
 
-    print(f"\n{'='*60}")
-    print(f"Testing: {model}")
-    print(f"{'='*60}")
+    log(f"\n{'='*60}")
+    log(f"Testing: {model}")
+    log(f"{'='*60}")
 
-    for i, prompt in enumerate(THINKING_PROMPTS):
-        print(f"\n  Test {i+1}: {prompt[:50]}...")
+    async with aiohttp.ClientSession() as session:
+        # One prompt at a time: Ollama serves a model's requests serially, so
+        # queued prompts would spend their timeout waiting behind each other
+        for i, prompt in enumerate(THINKING_PROMPTS):
+            log(f"\n  Test {i+1}: {prompt[:50]}...")
 
-        try:
-            # First try raw mode to catch hidden thinking tags
-            resp = requests.post(f'{OLLAMA_URL}/api/generate', json={
-                'model': model,
-                'prompt': prompt,
-                'stream': False,
-                'raw': True,  # Raw mode to preserve thinking tags
-                'options': {
-                    'num_ctx': 8192,
-                    'num_predict': 2048,  # Allow room for thinking
-                    'temperature': 0.7
-                }
-            }, timeout=timeout)
-
-            if resp.status_code == 200:
-                data = resp.json()
-                response = data.get('response', '')
-                output_tokens = data.get('eval_count', 0)
-
-                test_record = {
-                    "prompt": prompt[:50],
-                    "output_tokens": output_tokens,
-                    "patterns_found": []
-                }
-
-                # Check for thinking patterns
-                for pattern in THINKING_PATTERNS:
-                    if re.search(pattern, response, re.IGNORECASE):
+            try:
+                status, data = await _run_prompt(session, model, prompt, timeout)
+
+                if status == 200:
+                    response = data.get('response', '')
+                    output_tokens = data.get('eval_count', 0)
+
+                    test_record = {
+                        "prompt": prompt[:50],
+                        "output_tokens": output_tokens,
+                        "patterns_found": []
+                    }
+
+                    # Check for thinking patterns
+                    for pattern in find_thinking_patterns(response):
                         test_record["patterns_found"].append(pattern)
                         if pattern not in result["thinking_patterns_found"]:
                             result["thinking_patterns_found"].append(pattern)
 
-                # Check for explicit thinking tags
-                if re.search(r'<think>|</think>|<reasoning>|</reasoning>', response, re.IGNORECASE):
-                    result["thinking_tags_found"] = True
-                    test_record["has_thinking_tags"] = True
+                    # Check for explicit thinking tags
+                    if TAG_RE.search(response):
+                        result["thinking_tags_found"] = True
+                        test_record["has_thinking_tags"] = True
 
-                # Check if response is verbose (thinking models often produce longer output)
-                if output_tokens > 200:
-                    result["reasoning_verbose"] = True
+                    # Check if response is verbose (thinking models often produce longer output)
+                    if output_tokens > 200:
+                        result["reasoning_verbose"] = True
 
-                test_record["response_preview"] = response[:300] + "..." if len(response) > 300 else response
-                result["tests"].append(test_record)
+                    test_record["response_preview"] = response[:300] + "..." if len(response) > 300 else response
+                    result["tests"].append(test_record)
+                    # Release the full payload before the next (up to 120s) request
+                    del response, data
 
-                patterns_count = len(test_record["patterns_found"])
-                print(f"    Output: {output_tokens} tokens, {patterns_count} thinking patterns")
+                    patterns_count = len(test_record["patterns_found"])
+                    log(f"    Output: {output_tokens} tokens, {patterns_count} thinking patterns")
 
-                if test_record.get("has_thinking_tags"):
-                    print(f"    THINKING TAGS DETECTED!")
+                    if test_record.get("has_thinking_tags"):
+                        log(f"    THINKING TAGS DETECTED!")
+                        # Explicit tags decide the classification; skip remaining prompts
+                        break
 
-            else:
-                print(f"    FAILED: HTTP {resp.status_code}")
-                result["tests"].append({"prompt": prompt[:50], "error": f"HTTP {resp.status_code}"})
+                else:
+                    log(f"    FAILED: HTTP {status}")
+                    result["tests"].append({"prompt": prompt[:50], "error": f"HTTP {status}"})
 
-        except Exception as e:
-            print(f"    ERROR: {e}")
-            result["tests"].append({"prompt": prompt[:50], "error": str(e)[:50]})
+            except Exception as e:
+                log(f"    ERROR: {e}")
+                result["tests"].append({"prompt": prompt[:50], "error": str(e)[:50]})
 
     # Determine if this is a thinking model
     if result["thinking_tags_found"]:
@@ -139,9 +176,9 @@ def test_thinking_capability(model: str, timeout: int = 120) -> dict:
     else:
         result["thinking_type"] = "none"
 
-    print(f"\n  Result: {'THINKING MODEL' if result['is_thinking_model'] else 'Standard model'}")
-    print(f"  Type: {result['thinking_type']}")
-    print(f"  Patterns: {len(result['thinking_patterns_found'])}")
+    log(f"\n  Result: {'THINKING MODEL' if result['is_thinking_model'] else 'Standard model'}")
+    log(f"  Type: {result['thinking_type']}")
+    log(f"  Patterns: {len(result['thinking_patterns_found'])}")
 
     return result
 
@@ -165,31 +202,45 @@ def main():
         "gemma2:9b",
     ]
 
-    # Use command line args or defaults
-    if len(sys.argv) > 1:
-        models_to_test = sys.argv[1:]
-    else:
+    # Use command line args or defaults; --parallel=N tests N models at once
+    parallel = 1
+    models_to_test = []
+    for arg in sys.argv[1:]:
+        if arg.startswith("--parallel="):
+            parallel = max(1, int(arg.split("=", 1)[1]))
+        elif not arg.startswith("-"):
+            models_to_test.append(arg)
+    if not models_to_test:
         models_to_test = suspected_thinking + standard_models
 
     print("="*60)
     print("THINKING MODEL DETECTION TEST")
-    print(f"Started: {datetime.now().isoformat()}")
+    started = datetime.now()
+    print(f"Started: {started.isoformat(timespec='seconds')}")
     print(f"Models to test: {len(models_to_test)}")
     print("="*60)
 
-    all_results = []
-
-    for model in models_to_test:
+    def test_one(model):
+        lines = []
         try:
-            result = test_thinking_capability(model)
-            all_results.append(result)
+            result = asyncio.run(test_thinking_capability(model, log=lines.append))
         except Exception as e:
-            print(f"Error testing {model}: {e}")
-            all_results.append({
+            lines.append(f"Error testing {model}: {e}")
+            result = {
                 "model": model,
                 "error": str(e),
-                "timestamp": datetime.now().isoformat()
-            })
+                "timestamp": datetime.now().isoformat(timespec='seconds')
+            }
+        return result, lines
+
+    # One model at a time by default: concurrent models share one Ollama, so
+    # its queueing and model swaps eat into each request's timeout. Each
+    # worker returns its progress lines, which are printed in input order
+    all_results = []
+    with ThreadPoolExecutor(max_workers=min(len(models_to_test), parallel)) as ex:
+        for result, lines in ex.map(test_one, models_to_test):
+            print("\n".join(lines), flush=True)
+            all_results.append(result)
 
     # Summary
     print("\n" + "="*60)
@@ -208,10 +259,10 @@ def main():
         print(f"  - {r['model']}")
 
     # Save results
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    timestamp = started.strftime('%Y%m%d_%H%M%S')
     output_file = f"/home/roctinam/dev/fortemi/docs/research/thinking_test_results_{timestamp}.json"
-    with open(output_file, 'w') as f:
-        json.dump(all_results, f, indent=2)
+    with open(output_file, 'wb') as f:
+        f.write(orjson.dumps(all_results, option=orjson.OPT_INDENT_2))
     print(f"\nResults saved to: {output_file}")
 
     return all_results
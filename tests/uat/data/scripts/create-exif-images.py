@@ -4,21 +4,74 @@ Generate test images with EXIF metadata for UAT testing.
 
 Creates images with GPS coordinates, timestamps, and camera information
 to test EXIF extraction and W3C PROV provenance tracking.
+
+Most of the runtime is JPEG encoding of multi-megapixel images. On x86_64
+hosts with AVX2, Pillow-SIMD is an API-compatible replacement that speeds
+this up (generate-test-data.sh installs it when Pillow is missing):
+
+    pip uninstall -y Pillow && pip install pillow-simd
 """
 
+import functools
+import hashlib
+import json
+import multiprocessing
 import os
+import shutil
 import sys
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Tuple
 
-try:
-    from PIL import Image, ImageDraw, ImageFont
-    import piexif
-except ImportError as e:
-    print(f"Error: Missing required package: {e}")
-    print("Install with: pip3 install Pillow piexif")
-    sys.exit(1)
+# tests/uat/data, the parent of this scripts directory
+DATA_DIR = Path(__file__).resolve().parent.parent
+
+
+@functools.lru_cache(maxsize=None)
+def _pil():
+    """Import Pillow and piexif on first use.
+
+    Returns (Image, ImageDraw, ImageFont, piexif), so importing this module
+    stays stdlib-only; exits with an install hint if either is missing.
+    """
+    try:
+        from PIL import Image, ImageDraw, ImageFont
+        import piexif
+    except ImportError as e:
+        print(f"Error: Missing required package: {e}")
+        print("Install with: pip3 install Pillow piexif")
+        sys.exit(1)
+    return Image, ImageDraw, ImageFont, piexif
+
+
+@functools.lru_cache(maxsize=8)
+def load_font(size: int):
+    """Load the label font at size, parsing each TTF at most once per process."""
+    _, _, ImageFont, _ = _pil()
+    # Try to use a nice font, fallback to default
+    try:
+        return ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", size)
+    except OSError:
+        try:
+            return ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", size)
+        except OSError:
+            return ImageFont.load_default()
+
+
+def count_entries(directory: Path) -> int:
+    """Count directory entries without building Path objects for them."""
+    with os.scandir(directory) as it:
+        return sum(1 for _ in it)
+
+
+def decimal_to_dms(decimal: float) -> Tuple[Tuple[int, int], Tuple[int, int], Tuple[int, int]]:
+    """Convert decimal degrees to (degrees, minutes, seconds) as rationals."""
+    abs_decimal = abs(decimal)
+    degrees = int(abs_decimal)
+    minutes_decimal = (abs_decimal - degrees) * 60
+    minutes = int(minutes_decimal)
+    seconds = int((minutes_decimal - minutes) * 60 * 1000)  # Store with 3 decimal places
+    return ((degrees, 1), (minutes, 1), (seconds, 1000))
 
 
 class ExifImageGenerator:
@@ -33,25 +86,29 @@ class ExifImageGenerator:
         filename: str,
         size: Tuple[int, int] = (1920, 1080),
         text: str = "Test Image",
-        color: str = "#4A90E2"
+        color: str = "#4A90E2",
+        exif: Optional[bytes] = None
     ) -> Path:
-        """Create a simple colored image with text."""
+        """Create a simple colored image with text.
+
+        exif, if given (see build_exif), is written during the JPEG encode.
+        """
+        Image, ImageDraw, _, _ = _pil()
         img = Image.new('RGB', size, color)
         draw = ImageDraw.Draw(img)
 
-        # Try to use a nice font, fallback to default
-        try:
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 60)
-        except OSError:
-            try:
-                font = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 60)
-            except OSError:
-                font = ImageFont.load_default()
-
-        # Calculate text position (centered)
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
+        font = load_font(60)
+
+        # Calculate text position (centered). Single-line labels only need
+        # the advance width and line metrics; textbbox handles the rest
+        if "\n" not in text and hasattr(font, "getmetrics"):
+            text_width = int(font.getlength(text))
+            ascent, descent = font.getmetrics()
+            text_height = ascent + descent
+        else:
+            bbox = draw.textbbox((0, 0), text, font=font)
+            text_width = bbox[2] - bbox[0]
+            text_height = bbox[3] - bbox[1]
         position = ((size[0] - text_width) // 2, (size[1] - text_height) // 2)
 
         # Draw text
@@ -59,19 +116,22 @@ class ExifImageGenerator:
 
         # Save
         output_path = self.output_dir / filename
-        img.save(output_path, "JPEG", quality=85)
+        if exif:
+            img.save(output_path, "JPEG", exif=exif, **JPEG_SAVE_OPTIONS)
+        else:
+            img.save(output_path, "JPEG", **JPEG_SAVE_OPTIONS)
         return output_path
 
-    def add_exif(
+    def build_exif(
         self,
-        image_path: Path,
         gps: Optional[Tuple[float, float, float]] = None,  # lat, lon, alt
         datetime_str: Optional[str] = None,
         make: Optional[str] = None,
         model: Optional[str] = None,
         software: Optional[str] = None
-    ):
-        """Add EXIF metadata to an image."""
+    ) -> bytes:
+        """Build a raw EXIF block (APP1 payload) from the given metadata."""
+        _, _, _, piexif = _pil()
         exif_dict = {"0th": {}, "Exif": {}, "GPS": {}, "1st": {}, "thumbnail": None}
 
         # Camera info
@@ -96,21 +156,6 @@ class ExifImageGenerator:
             lat, lon, alt = gps
 
             # Convert decimal degrees to degrees, minutes, seconds
-            def decimal_to_dms(decimal: float) -> Tuple[Tuple[int, int], Tuple[int, int], Tuple[int, int]]:
-                """Convert decimal degrees to (degrees, minutes, seconds) as rationals."""
-                abs_decimal = abs(decimal)
-                degrees = int(abs_decimal)
-                minutes_decimal = (abs_decimal - degrees) * 60
-                minutes = int(minutes_decimal)
-                seconds_decimal = (minutes_decimal - minutes) * 60
-                seconds = int(seconds_decimal * 1000)  # Store with 3 decimal places
-
-                return (
-                    (degrees, 1),
-                    (minutes, 1),
-                    (seconds, 1000)
-                )
-
             lat_dms = decimal_to_dms(lat)
             lon_dms = decimal_to_dms(lon)
 
@@ -125,186 +170,221 @@ class ExifImageGenerator:
                 exif_dict["GPS"][piexif.GPSIFD.GPSAltitude] = (alt_int, 100)
                 exif_dict["GPS"][piexif.GPSIFD.GPSAltitudeRef] = 0 if alt >= 0 else 1
 
-        # Write EXIF
-        exif_bytes = piexif.dump(exif_dict)
-        piexif.insert(exif_bytes, str(image_path))
+        return piexif.dump(exif_dict)
 
     def strip_exif(self, image_path: Path):
         """Remove all EXIF metadata from an image."""
-        img = Image.open(image_path)
-        # Remove EXIF by saving without it
-        data = list(img.getdata())
-        image_no_exif = Image.new(img.mode, img.size)
-        image_no_exif.putdata(data)
-        image_no_exif.save(image_path, "JPEG", quality=85)
+        Image, _, _, _ = _pil()
+        with Image.open(image_path) as img:
+            # Copy the raw pixel buffer into a fresh image so no EXIF, ICC
+            # or XMP carried in img.info is written back
+            image_no_exif = Image.frombytes(img.mode, img.size, img.tobytes())
+        image_no_exif.save(image_path, "JPEG", **JPEG_SAVE_OPTIONS)
+
+
+# Baseline 4:2:0 JPEG; an explicit subsampling skips Pillow's "keep" lookup
+JPEG_SAVE_OPTIONS = {"quality": 85, "subsampling": 2, "optimize": False, "progressive": False}
+
+# Output path (relative to the data dir) -> hash of the spec that produced it,
+# plus the file's mtime and size when it was written
+MANIFEST_NAME = ".generated.json"
+
+
+def _spec_hash(spec: dict, data_dir: Path, script_digest: str) -> str:
+    """Hash a JPEG spec together with this script's source.
+
+    Folding in the script digest invalidates every entry when the rendering
+    code changes, not just when a spec does.
+    """
+    key = dict(spec, output_dir=str(spec["output_dir"].relative_to(data_dir)))
+    return hashlib.sha256(f"{script_digest}:{key!r}".encode()).hexdigest()
+
+
+def _file_stamp(path: Path) -> Optional[dict]:
+    """Return path's mtime and size for the manifest, or None if it is missing."""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def _make_one(spec: dict) -> Path:
+    """Create one JPEG from a spec, with its EXIF or stripped (pool worker)."""
+    gen = ExifImageGenerator(spec["output_dir"])
+    # EXIF goes into the initial encode rather than a piexif.insert rewrite
+    exif = gen.build_exif(**spec["exif"]) if spec.get("exif") else None
+    img_path = gen.create_image(spec["filename"], exif=exif, **spec["image"])
+    if spec.get("strip"):
+        gen.strip_exif(img_path)
+    return img_path
 
 
 def main():
-    script_dir = Path(__file__).parent
-    data_dir = script_dir.parent
+    # Fail fast on missing dependencies before any files are written
+    Image, ImageDraw, _, _ = _pil()
+
+    data_dir = DATA_DIR
     images_dir = data_dir / "images"
     provenance_dir = data_dir / "provenance"
 
-    gen = ExifImageGenerator(images_dir)
-    prov_gen = ExifImageGenerator(provenance_dir)
+    images_dir.mkdir(parents=True, exist_ok=True)
+    provenance_dir.mkdir(parents=True, exist_ok=True)
+
+    # JPEG specs. Encoding dominates, so they are generated in a process
+    # pool after the small PNG/WebP images below.
+    specs = [
+        # 1. JPEG with full EXIF metadata
+        {
+            "output_dir": images_dir,
+            "filename": "jpeg-with-exif.jpg",
+            "image": {"size": (4032, 3024), "text": "Paris 2024", "color": "#E74C3C"},
+            "exif": {
+                "gps": (48.8584, 2.2945, 35.0),  # Eiffel Tower
+                "datetime_str": "2024-06-15T14:30:00Z",
+                "make": "Apple",
+                "model": "iPhone 15 Pro",
+                "software": "iOS 17.5",
+            },
+        },
+        # 2. JPEG without metadata
+        {
+            "output_dir": images_dir,
+            "filename": "jpeg-no-metadata.jpg",
+            "image": {"size": (1920, 1080), "text": "No Metadata", "color": "#95A5A6"},
+            "strip": True,
+        },
+        # 5. Faces group photo placeholder (would need real photo or AI generation)
+        {
+            "output_dir": images_dir,
+            "filename": "faces-group-photo.jpg",
+            "image": {"size": (2048, 1536), "text": "Group Photo\n(Use real photo or download)", "color": "#E67E22"},
+        },
+        # 6. Object scene placeholder
+        {
+            "output_dir": images_dir,
+            "filename": "object-scene.jpg",
+            "image": {"size": (1920, 1080), "text": "Workspace Scene\n(Use real photo or download)", "color": "#16A085"},
+        },
+        # 7. Unicode filename with emoji
+        {
+            "output_dir": images_dir,
+            "filename": "emoji-unicode-名前.jpg",
+            "image": {"size": (1024, 768), "text": "Unicode 🎨 名前", "color": "#9B59B6"},
+        },
+        # Provenance: Paris - Eiffel Tower
+        {
+            "output_dir": provenance_dir,
+            "filename": "paris-eiffel-tower.jpg",
+            "image": {"size": (3840, 2160), "text": "Paris 🗼", "color": "#E74C3C"},
+            "exif": {
+                "gps": (48.8584, 2.2945, 35.0),
+                "datetime_str": "2024-07-14T12:00:00Z",
+                "make": "Canon",
+                "model": "EOS R5",
+            },
+        },
+        # Provenance: New York - Statue of Liberty
+        {
+            "output_dir": provenance_dir,
+            "filename": "newyork-statue-liberty.jpg",
+            "image": {"size": (4096, 2732), "text": "New York 🗽", "color": "#3498DB"},
+            "exif": {
+                "gps": (40.6892, -74.0445, 10.0),
+                "datetime_str": "2024-07-04T16:30:00Z",
+                "make": "Nikon",
+                "model": "Z9",
+            },
+        },
+        # Provenance: Tokyo - Shibuya
+        {
+            "output_dir": provenance_dir,
+            "filename": "tokyo-shibuya.jpg",
+            "image": {"size": (4320, 2880), "text": "Tokyo 🏙️", "color": "#E67E22"},
+            "exif": {
+                "gps": (35.6595, 139.7004, 30.0),
+                "datetime_str": "2024-03-21T09:00:00Z",
+                "make": "Sony",
+                "model": "α7R V",
+            },
+        },
+        # Provenance: Historical date
+        {
+            "output_dir": provenance_dir,
+            "filename": "dated-2020-01-01.jpg",
+            "image": {"size": (3024, 4032), "text": "2020-01-01", "color": "#1ABC9C"},
+            "exif": {
+                "datetime_str": "2020-01-01T00:00:00Z",
+                "make": "Apple",
+                "model": "iPhone 11",
+            },
+        },
+        # Provenance: Future date
+        {
+            "output_dir": provenance_dir,
+            "filename": "dated-2025-12-31.jpg",
+            "image": {"size": (4080, 3072), "text": "2025-12-31", "color": "#9B59B6"},
+            "exif": {
+                "datetime_str": "2025-12-31T23:59:59Z",
+                "make": "Google",
+                "model": "Pixel 9 Pro",
+            },
+        },
+    ]
 
     print("Generating test images with EXIF metadata...")
 
-    # 1. JPEG with full EXIF metadata
-    print("  Creating jpeg-with-exif.jpg...")
-    img_path = gen.create_image(
-        "jpeg-with-exif.jpg",
-        size=(4032, 3024),
-        text="Paris 2024",
-        color="#E74C3C"
-    )
-    gen.add_exif(
-        img_path,
-        gps=(48.8584, 2.2945, 35.0),  # Eiffel Tower
-        datetime_str="2024-06-15T14:30:00Z",
-        make="Apple",
-        model="iPhone 15 Pro",
-        software="iOS 17.5"
-    )
-
-    # 2. JPEG without metadata
-    print("  Creating jpeg-no-metadata.jpg...")
-    img_path = gen.create_image(
-        "jpeg-no-metadata.jpg",
-        size=(1920, 1080),
-        text="No Metadata",
-        color="#95A5A6"
-    )
-    gen.strip_exif(img_path)
-
     # 3. PNG with transparency (no EXIF support)
     print("  Creating png-transparent.png...")
     png_path = images_dir / "png-transparent.png"
     img = Image.new('RGBA', (512, 512), (0, 0, 0, 0))
     draw = ImageDraw.Draw(img)
     draw.ellipse([128, 128, 384, 384], fill=(74, 144, 226, 255))
-    img.save(png_path, "PNG")
+    # Pixel content is all that matters here; use the fastest zlib level
+    img.save(png_path, "PNG", compress_level=1)
 
     # 4. WebP modern format
     print("  Creating webp-modern.webp...")
     webp_path = images_dir / "webp-modern.webp"
     img = Image.new('RGB', (1920, 1080), "#3498DB")
     draw = ImageDraw.Draw(img)
-    try:
-        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 80)
-    except OSError:
-        font = ImageFont.load_default()
+    font = load_font(80)
     draw.text((600, 480), "WebP Format", fill="white", font=font)
-    img.save(webp_path, "WEBP", quality=85)
-
-    # 5. Faces group photo placeholder (would need real photo or AI generation)
-    print("  Creating faces-group-photo.jpg (placeholder)...")
-    img_path = gen.create_image(
-        "faces-group-photo.jpg",
-        size=(2048, 1536),
-        text="Group Photo\n(Use real photo or download)",
-        color="#E67E22"
-    )
-
-    # 6. Object scene placeholder
-    print("  Creating object-scene.jpg (placeholder)...")
-    img_path = gen.create_image(
-        "object-scene.jpg",
-        size=(1920, 1080),
-        text="Workspace Scene\n(Use real photo or download)",
-        color="#16A085"
-    )
-
-    # 7. Unicode filename with emoji
-    print("  Creating emoji-unicode-名前.jpg...")
-    img_path = gen.create_image(
-        "emoji-unicode-名前.jpg",
-        size=(1024, 768),
-        text="Unicode 🎨 名前",
-        color="#9B59B6"
-    )
-
-    # Provenance images
-    print("")
-    print("Generating provenance test images...")
-
-    # Paris - Eiffel Tower
-    print("  Creating paris-eiffel-tower.jpg...")
-    img_path = prov_gen.create_image(
-        "paris-eiffel-tower.jpg",
-        size=(3840, 2160),
-        text="Paris 🗼",
-        color="#E74C3C"
-    )
-    prov_gen.add_exif(
-        img_path,
-        gps=(48.8584, 2.2945, 35.0),
-        datetime_str="2024-07-14T12:00:00Z",
-        make="Canon",
-        model="EOS R5"
-    )
-
-    # New York - Statue of Liberty
-    print("  Creating newyork-statue-liberty.jpg...")
-    img_path = prov_gen.create_image(
-        "newyork-statue-liberty.jpg",
-        size=(4096, 2732),
-        text="New York 🗽",
-        color="#3498DB"
-    )
-    prov_gen.add_exif(
-        img_path,
-        gps=(40.6892, -74.0445, 10.0),
-        datetime_str="2024-07-04T16:30:00Z",
-        make="Nikon",
-        model="Z9"
-    )
-
-    # Tokyo - Shibuya
-    print("  Creating tokyo-shibuya.jpg...")
-    img_path = prov_gen.create_image(
-        "tokyo-shibuya.jpg",
-        size=(4320, 2880),
-        text="Tokyo 🏙️",
-        color="#E67E22"
-    )
-    prov_gen.add_exif(
-        img_path,
-        gps=(35.6595, 139.7004, 30.0),
-        datetime_str="2024-03-21T09:00:00Z",
-        make="Sony",
-        model="α7R V"
-    )
-
-    # Historical date
-    print("  Creating dated-2020-01-01.jpg...")
-    img_path = prov_gen.create_image(
-        "dated-2020-01-01.jpg",
-        size=(3024, 4032),
-        text="2020-01-01",
-        color="#1ABC9C"
-    )
-    prov_gen.add_exif(
-        img_path,
-        datetime_str="2020-01-01T00:00:00Z",
-        make="Apple",
-        model="iPhone 11"
-    )
-
-    # Future date
-    print("  Creating dated-2025-12-31.jpg...")
-    img_path = prov_gen.create_image(
-        "dated-2025-12-31.jpg",
-        size=(4080, 3072),
-        text="2025-12-31",
-        color="#9B59B6"
-    )
-    prov_gen.add_exif(
-        img_path,
-        datetime_str="2025-12-31T23:59:59Z",
-        make="Google",
-        model="Pixel 9 Pro"
-    )
+    img.save(webp_path, "WEBP", quality=85, method=0)
+
+    # Skip JPEGs whose spec (and this script) are unchanged since they were
+    # last generated and whose file is still on disk with the recorded mtime
+    # and size, so a replaced or edited image is regenerated
+    manifest_path = data_dir / MANIFEST_NAME
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (OSError, ValueError):
+        manifest = {}
+    script_digest = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
+    pending = []
+    for spec in specs:
+        rel = str((spec["output_dir"] / spec["filename"]).relative_to(data_dir))
+        spec_hash = _spec_hash(spec, data_dir, script_digest)
+        stamp = _file_stamp(data_dir / rel)
+        if stamp is not None and manifest.get(rel) == {"spec": spec_hash, "file": stamp}:
+            print(f"  Up to date: {rel}")
+        else:
+            pending.append((rel, spec_hash, spec))
+
+    if pending:
+        print(f"  Creating {len(pending)} JPEG images on {os.cpu_count()} processes...")
+        with multiprocessing.Pool() as pool:
+            results = pool.imap(_make_one, [spec for _, _, spec in pending])
+            for (rel, spec_hash, _), img_path in zip(pending, results):
+                manifest[rel] = {"spec": spec_hash, "file": _file_stamp(img_path)}
+                print(f"  Created {img_path.relative_to(data_dir)}")
+
+        # Write the manifest atomically so an interrupted run never leaves
+        # a truncated file behind
+        tmp_path = manifest_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+        os.replace(tmp_path, manifest_path)
 
     # Duplicate content test files
     print("  Creating duplicate-content-1.txt...")
@@ -314,15 +394,23 @@ The hash of this content should match duplicate-content-2.txt exactly.
 
 Lorem ipsum dolor sit amet, consectetur adipiscing elit. Sed do eiusmod tempor incididunt ut labore et dolore magna aliqua.
 """
-    (provenance_dir / "duplicate-content-1.txt").write_text(duplicate_content)
+    duplicate_1 = provenance_dir / "duplicate-content-1.txt"
+    duplicate_1.write_bytes(duplicate_content.encode('utf-8'))
 
+    # Byte-identical by construction: hardlink the first file, or copy it
+    # where the filesystem does not support links
     print("  Creating duplicate-content-2.txt...")
-    (provenance_dir / "duplicate-content-2.txt").write_text(duplicate_content)
+    duplicate_2 = provenance_dir / "duplicate-content-2.txt"
+    duplicate_2.unlink(missing_ok=True)
+    try:
+        os.link(duplicate_1, duplicate_2)
+    except OSError:
+        shutil.copyfile(duplicate_1, duplicate_2)
 
     print("")
     print("✓ Image generation complete!")
-    print(f"  Images: {len(list(images_dir.glob('*')))}")
-    print(f"  Provenance: {len(list(provenance_dir.glob('*')))}")
+    print(f"  Images: {count_entries(images_dir)}")
+    print(f"  Provenance: {count_entries(provenance_dir)}")
 
 
 if __name__ == "__main__":
@@ -3,6 +3,9 @@
 
 from pathlib import Path
 
+# tests/uat/data, the parent of this scripts directory
+DATA_DIR = Path(__file__).resolve().parent.parent
+
 
 PYTHON_SAMPLE = '''"""Sample Python module for testing code chunking."""
 
@@ -284,8 +287,7 @@ export function isProcessorConfig(obj: unknown): obj is ProcessorConfig {
 '''
 
 def main():
-    script_dir = Path(__file__).parent
-    data_dir = script_dir.parent
+    data_dir = DATA_DIR
     documents_dir = data_dir / "documents"
     documents_dir.mkdir(parents=True, exist_ok=True)
 
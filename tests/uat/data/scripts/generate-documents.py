@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 """Generate document samples (Markdown, JSON, YAML, CSV)."""
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import json
 
+# tests/uat/data, the parent of this scripts directory
+DATA_DIR = Path(__file__).resolve().parent.parent
+
 
 MARKDOWN_SAMPLE = """# Test Document: Markdown Formatting
 
@@ -109,6 +113,8 @@ JSON_CONFIG = {
     }
 }
 
+JSON_CONFIG_TEXT = json.dumps(JSON_CONFIG, indent=2)
+
 YAML_CONFIG = """name: matric-memory-test-config
 version: 1.0.0
 
@@ -148,6 +154,11 @@ logging:
     - file
 """
 
+# Encoded once at import; main() writes these bytes directly
+MARKDOWN_SAMPLE_BYTES = MARKDOWN_SAMPLE.encode("utf-8")
+JSON_CONFIG_BYTES = JSON_CONFIG_TEXT.encode("utf-8")
+YAML_CONFIG_BYTES = YAML_CONFIG.encode("utf-8")
+
 
 def generate_csv(filepath: Path, rows: int = 100):
     """Generate a CSV file with test data."""
@@ -162,44 +173,53 @@ def generate_csv(filepath: Path, rows: int = 100):
         "Maya Patel", "Noah Garcia", "Olivia Rodriguez", "Paul Anderson"
     ]
 
-    with open(filepath, 'w', newline='') as f:
+    # 1MB buffer keeps write() syscalls rare if rows is scaled up
+    with open(filepath, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
         writer = csv.writer(f)
         writer.writerow(['id', 'name', 'email', 'created_at', 'status'])
 
-        for i in range(1, rows + 1):
-            name = random.choice(names)
-            first_name = name.split()[0].lower()
-            email = f"{first_name}.{i}@example.com"
-            created = datetime(2024, 1, 1) + timedelta(days=i % 365)
-            status = random.choice(['active', 'inactive', 'pending'])
-            writer.writerow([i, name, email, created.isoformat() + 'Z', status])
+        # Draw all random columns up front and precompute per-name and
+        # per-day strings, then emit every row in one writerows call
+        ids = range(1, rows + 1)
+        row_names = random.choices(names, k=rows)
+        statuses = random.choices(['active', 'inactive', 'pending'], k=rows)
+        first_names = {name: name.split()[0].lower() for name in names}
+        start = datetime(2024, 1, 1)
+        dates = [(start + timedelta(days=d)).isoformat() + 'Z' for d in range(365)]
+        writer.writerows(
+            (i, name, f"{first_names[name]}.{i}@example.com", dates[i % 365], status)
+            for i, name, status in zip(ids, row_names, statuses)
+        )
 
 
 def main():
-    script_dir = Path(__file__).parent
-    data_dir = script_dir.parent
+    data_dir = DATA_DIR
     documents_dir = data_dir / "documents"
     documents_dir.mkdir(parents=True, exist_ok=True)
 
     print("Generating document samples...")
 
-    # Markdown
-    print("  Creating markdown-formatted.md...")
-    (documents_dir / "markdown-formatted.md").write_text(MARKDOWN_SAMPLE)
-
-    # JSON
-    print("  Creating json-config.json...")
-    (documents_dir / "json-config.json").write_text(
-        json.dumps(JSON_CONFIG, indent=2)
-    )
-
-    # YAML
-    print("  Creating yaml-config.yaml...")
-    (documents_dir / "yaml-config.yaml").write_text(YAML_CONFIG)
+    text_files = [
+        # Markdown
+        ("markdown-formatted.md", MARKDOWN_SAMPLE_BYTES),
+        # JSON
+        ("json-config.json", JSON_CONFIG_BYTES),
+        # YAML
+        ("yaml-config.yaml", YAML_CONFIG_BYTES),
+    ]
 
-    # CSV
-    print("  Creating csv-data.csv...")
-    generate_csv(documents_dir / "csv-data.csv", rows=100)
+    # The files are independent, so overlap their writes
+    with ThreadPoolExecutor(max_workers=4) as ex:
+        futures = [
+            (name, ex.submit((documents_dir / name).write_bytes, content))
+            for name, content in text_files
+        ]
+        # CSV
+        futures.append(("csv-data.csv", ex.submit(generate_csv, documents_dir / "csv-data.csv", rows=100)))
+
+        for name, future in futures:
+            future.result()
+            print(f"  Created {name}")
 
     print("")
     print("✓ Generated 4 document files")
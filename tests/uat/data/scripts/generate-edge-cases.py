@@ -4,10 +4,17 @@
 import os
 from pathlib import Path
 
+# tests/uat/data, the parent of this scripts directory
+DATA_DIR = Path(__file__).resolve().parent.parent
+
+# (filename, size in bytes) for fixtures filled with random data
+RANDOM_FIXTURES = [
+    ("binary-wrong-ext.jpg", 10240),  # 10KB random bytes
+]
+
 
 def main():
-    script_dir = Path(__file__).parent
-    data_dir = script_dir.parent
+    data_dir = DATA_DIR
     edge_cases_dir = data_dir / "edge-cases"
     edge_cases_dir.mkdir(parents=True, exist_ok=True)
 
@@ -19,20 +26,22 @@ def main():
 
     # 2. Large text file (>100KB)
     print("  Creating large-text-100kb.txt...")
-    lorem = """Lorem ipsum dolor sit amet, consectetur adipiscing elit. Sed do eiusmod tempor incididunt ut labore et dolore magna aliqua. Ut enim ad minim veniam, quis nostrud exercitation ullamco laboris nisi ut aliquip ex ea commodo consequat. Duis aute irure dolor in reprehenderit in voluptate velit esse cillum dolore eu fugiat nulla pariatur. Excepteur sint occaecat cupidatat non proident, sunt in culpa qui officia deserunt mollit anim id est laborum.
+    lorem = b"""Lorem ipsum dolor sit amet, consectetur adipiscing elit. Sed do eiusmod tempor incididunt ut labore et dolore magna aliqua. Ut enim ad minim veniam, quis nostrud exercitation ullamco laboris nisi ut aliquip ex ea commodo consequat. Duis aute irure dolor in reprehenderit in voluptate velit esse cillum dolore eu fugiat nulla pariatur. Excepteur sint occaecat cupidatat non proident, sunt in culpa qui officia deserunt mollit anim id est laborum.
 
 """
     large_file = edge_cases_dir / "large-text-100kb.txt"
-    with open(large_file, 'w') as f:
-        while f.tell() < 100_000:
-            f.write(lorem)
+    # Same content as appending lorem until >= 100KB, in a single write
+    large_file.write_bytes(lorem * -(-100_000 // len(lorem)))
     print(f"    Size: {large_file.stat().st_size} bytes")
 
-    # 3. Binary file with wrong extension
-    print("  Creating binary-wrong-ext.jpg...")
-    (edge_cases_dir / "binary-wrong-ext.jpg").write_bytes(
-        os.urandom(10240)  # 10KB random bytes
-    )
+    # 3. Binary file with wrong extension (all random fixtures are sliced
+    # from one urandom draw)
+    random_bytes = memoryview(os.urandom(sum(size for _, size in RANDOM_FIXTURES)))
+    offset = 0
+    for filename, size in RANDOM_FIXTURES:
+        print(f"  Creating {filename}...")
+        (edge_cases_dir / filename).write_bytes(random_bytes[offset:offset + size])
+        offset += size
 
     # 4. Unicode filename
     print("  Creating unicode-filename-测试.txt...")
@@ -43,8 +52,8 @@ def main():
 
     # 5. Whitespace-only file
     print("  Creating whitespace-only.txt...")
-    (edge_cases_dir / "whitespace-only.txt").write_text(
-        "    \n\t\t  \n\n    \n" * 20
+    (edge_cases_dir / "whitespace-only.txt").write_bytes(
+        b"    \n\t\t  \n\n    \n" * 20
     )
 
     # 6. Malformed JSON
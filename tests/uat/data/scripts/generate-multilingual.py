@@ -9,10 +9,16 @@ Creates text files in various languages to test:
 - Emoji/trigram search
 """
 
+import os
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# tests/uat/data, the parent of this scripts directory
+DATA_DIR = Path(__file__).resolve().parent.parent
 
-SAMPLES = {
+
+_RAW_SAMPLES = {
     "english.txt": """The quick brown fox jumps over the lazy dog. This sentence contains every letter of the English alphabet at least once.
 
 Natural language processing enables computers to understand, interpret, and generate human language. Modern NLP systems use transformer architectures and attention mechanisms to achieve state-of-the-art results on tasks like translation, summarization, and question answering.
@@ -193,22 +199,85 @@ Emoji reactions for testing: 👍👎👌✌️🤞🤟🤘🤙👏🙌
 """,
 }
 
+# Samples are normalized at import so the generated corpora are byte-stable
+# regardless of how an editor stored the literals. Arabic and Hebrew use
+# NFKC to also fold presentation forms; NFKC would rewrite the full-width
+# CJK punctuation and emoji variation sequences, so everything else is NFC.
+_NORMALIZATION = {"arabic.txt": "NFKC", "hebrew.txt": "NFKC"}
+SAMPLES = {
+    filename: unicodedata.normalize(_NORMALIZATION.get(filename, "NFC"), content)
+    for filename, content in _RAW_SAMPLES.items()
+}
+
+
+def _pack(samples: dict) -> tuple:
+    """UTF-8 encode samples back to back into one blob.
+
+    Returns (blob, [(filename, start, length), ...]).
+    """
+    chunks, index, offset = [], [], 0
+    for filename, content in samples.items():
+        data = content.encode('utf-8')
+        chunks.append(data)
+        index.append((filename, offset, len(data)))
+        offset += len(data)
+    return b"".join(chunks), index
+
+
+# Encoded once at import; main() writes zero-copy memoryview slices of _BLOB
+_BLOB, _INDEX = _pack(SAMPLES)
+
+
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+
+def write_if_changed(filepath: Path, data) -> bool:
+    """Write data (bytes-like) to filepath unless it already holds exactly those bytes.
+
+    Returns True if the file was written.
+    """
+    try:
+        if filepath.stat().st_size == len(data) and filepath.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    # Raw fd write: no BufferedWriter wrapper for a payload written in one go
+    fd = os.open(filepath, _WRITE_FLAGS, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+    return True
+
 
 def main():
-    script_dir = Path(__file__).parent
-    data_dir = script_dir.parent
+    data_dir = DATA_DIR
     multilingual_dir = data_dir / "multilingual"
     multilingual_dir.mkdir(parents=True, exist_ok=True)
 
     print("Generating multilingual text samples...")
 
-    for filename, content in SAMPLES.items():
-        filepath = multilingual_dir / filename
-        filepath.write_text(content, encoding='utf-8')
-        print(f"  ✓ Created {filename}")
+    blob = memoryview(_BLOB)
+
+    # Files are independent, so overlap their I/O; results come back in
+    # _INDEX order, keeping the report deterministic
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        written = ex.map(
+            lambda entry: write_if_changed(
+                multilingual_dir / entry[0], blob[entry[1]:entry[1] + entry[2]]
+            ),
+            _INDEX,
+        )
+        for (filename, _, _), was_written in zip(_INDEX, written):
+            if was_written:
+                print(f"  ✓ Created {filename}")
+            else:
+                print(f"  · Unchanged {filename}")
 
     print("")
-    print(f"✓ Generated {len(SAMPLES)} multilingual text files")
+    print(f"✓ Generated {len(_INDEX)} multilingual text files")
     print("")
     print("Language coverage:")
     print("  FTS Stemming: English, German, French, Spanish, Portuguese, Russian")
@@ -93,7 +93,13 @@ echo ""
 echo "Checking Python packages..."
 $PYTHON -c "import PIL" 2>/dev/null && echo -e "${GREEN}✓${NC} Pillow" || {
     echo -e "${YELLOW}⚠${NC} Pillow not installed - installing..."
-    $PIP install Pillow
+    # Pillow-SIMD is a drop-in fork with AVX2 kernels; it builds from source,
+    # so fall back to stock Pillow if the build fails
+    if grep -qw avx2 /proc/cpuinfo 2>/dev/null; then
+        $PIP install pillow-simd || $PIP install Pillow
+    else
+        $PIP install Pillow
+    fi
 }
 
 $PYTHON -c "import piexif" 2>/dev/null && echo -e "${GREEN}✓${NC} piexif" || {